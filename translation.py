@@ -1,12 +1,20 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+import argparse
 import json
+import os
 import subprocess
 import requests
 import sys
 import time
 from datetime import datetime
 
+SOURCE_FILE = 'battlebase-data-en.json'
+OUTPUT_FILE = 'battlebase-data.json'
+SOURCE_INDEX_FILE = 'battlebase-data-en.index.json'
+UNTRANSLATED_IDS_FILE = 'untranslated_ids.txt'
+NO_UNTRANSLATED_IDS = "Aucun ID non traduit trouvé"
+
 def download_latest_file():
     """Télécharge la dernière version du fichier depuis GitHub"""
     url = "https://raw.githubusercontent.com/plague-fetishist/battlebase-data-full/refs/heads/main/battlebase-data.json"
@@ -49,10 +57,10 @@ def download_latest_file():
         print(f"Remplacement des apostrophes dans {count} IDs")
         
         # Sauvegarder avec le suffixe -en
-        with open('battlebase-data-en.json', 'w', encoding='utf-8') as f:
+        with open(SOURCE_FILE, 'w', encoding='utf-8') as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
         
-        print("Fichier téléchargé avec succès (sauvegardé comme battlebase-data-en.json)")
+        print(f"Fichier téléchargé avec succès (sauvegardé comme {SOURCE_FILE})")
         return True
     except Exception as e:
         print(f"Erreur lors du téléchargement: {e}")
@@ -315,7 +323,7 @@ def push_to_github():
         
         # Ajouter le fichier traduit
         print("Ajout du fichier traduit...")
-        subprocess.run(['git', 'add', 'battlebase-data.json'], check=True)
+        subprocess.run(['git', 'add', OUTPUT_FILE], check=True)
         
         # Créer le commit
         print("Création du commit...")
@@ -344,6 +352,320 @@ def push_to_github():
             pass
         return False
 
+def normalize_id(entry_id):
+    """Normalise un ID pour comparer les IDs source (_) et traduits (-)"""
+    return entry_id.strip().replace("-", "_").replace("'", "_")
+
+def iter_json_array_spans(text):
+    """Parcourt un tableau JSON et renvoie (début, fin, objet) pour chaque élément"""
+    decoder = json.JSONDecoder()
+    position = text.index('[') + 1
+    length = len(text)
+    while True:
+        while position < length and text[position] in ' \t\r\n,':
+            position += 1
+        if position >= length or text[position] == ']':
+            return
+        obj, end = decoder.raw_decode(text, position)
+        yield position, end, obj
+        position = end
+
+def build_source_index(source_file=SOURCE_FILE, index_file=SOURCE_INDEX_FILE):
+    """Construit l'index sur disque (ID normalisé -> position en octets) du fichier source"""
+    print(f"Construction de l'index de {source_file}...")
+    # newline='' pour que le texte décodé corresponde exactement aux octets du fichier (CRLF compris)
+    with open(source_file, 'r', encoding='utf-8', newline='') as f:
+        text = f.read()
+    
+    entries = {}
+    duplicate_ids = []
+    byte_position = 0
+    char_position = 0
+    for start, end, item in iter_json_array_spans(text):
+        # Convertir les positions en caractères en positions en octets (UTF-8)
+        byte_position += len(text[char_position:start].encode('utf-8'))
+        byte_length = len(text[start:end].encode('utf-8'))
+        normalized = normalize_id(item['id'])
+        # Comme main(), garder la première occurrence d'un ID en double
+        if normalized in entries:
+            duplicate_ids.append(item['id'])
+        else:
+            entries[normalized] = [byte_position, byte_length]
+        byte_position += byte_length
+        char_position = end
+    
+    if duplicate_ids:
+        print(f"  ⚠️  {len(duplicate_ids)} IDs en double dans {source_file}, seule la première occurrence est indexée:")
+        for entry_id in duplicate_ids[:5]:
+            print(f"     - {entry_id}")
+        if len(duplicate_ids) > 5:
+            print(f"     ... et {len(duplicate_ids) - 5} autres")
+    
+    stat = os.stat(source_file)
+    index = {
+        'source': source_file,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'entries': entries,
+    }
+    with open(index_file, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False)
+    
+    print(f"  Index sauvegardé dans {index_file} ({len(entries)} entrées)")
+    return index
+
+def load_source_index(source_file=SOURCE_FILE, index_file=SOURCE_INDEX_FILE):
+    """Charge l'index du fichier source, et le reconstruit s'il est absent ou périmé"""
+    stat = os.stat(source_file)
+    try:
+        with open(index_file, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        if index.get('size') == stat.st_size and index.get('mtime_ns') == stat.st_mtime_ns:
+            return index
+        print(f"Index {index_file} périmé")
+    except (OSError, ValueError):
+        pass
+    return build_source_index(source_file, index_file)
+
+def read_indexed_entries(index, normalized_ids, source_file=SOURCE_FILE):
+    """Lit uniquement les entrées demandées dans le fichier source grâce à l'index"""
+    entries = []
+    with open(source_file, 'rb') as f:
+        for normalized in normalized_ids:
+            offset, length = index['entries'][normalized]
+            f.seek(offset)
+            entries.append(json.loads(f.read(length).decode('utf-8')))
+    return entries
+
+def select_entry_ids(index, ids=None, prefixes=None, fields=None, source_file=SOURCE_FILE):
+    """Sélectionne les IDs normalisés à retraduire selon une liste d'IDs, un préfixe ou des champs"""
+    if ids is None and not prefixes:
+        # Sélection par champs uniquement: toutes les entrées de l'index sont candidates
+        selected = list(index['entries'])
+    else:
+        selected = []
+        seen = set()
+        if ids is not None:
+            for entry_id in ids:
+                normalized = normalize_id(entry_id)
+                if normalized not in index['entries']:
+                    print(f"  ⚠️  ID introuvable dans {source_file}: {entry_id}")
+                elif normalized not in seen:
+                    selected.append(normalized)
+                    seen.add(normalized)
+        for prefix in prefixes or []:
+            normalized_prefix = normalize_id(prefix)
+            matches = [normalized for normalized in index['entries'] if normalized.startswith(normalized_prefix)]
+            if not matches:
+                print(f"  ⚠️  Aucune entrée ne commence par: {prefix}")
+            for normalized in matches:
+                if normalized not in seen:
+                    selected.append(normalized)
+                    seen.add(normalized)
+    
+    if not fields:
+        return selected
+    
+    # Ne garder que les entrées qui possèdent au moins un des champs demandés
+    entries = read_indexed_entries(index, selected, source_file)
+    return [normalized for normalized, entry in zip(selected, entries)
+            if any(entry.get(field) is not None for field in fields)]
+
+def format_entry(entry, newline='\n'):
+    """Sérialise une entrée avec la même indentation que json.dump(data, indent=2)"""
+    return json.dumps(entry, indent=2, ensure_ascii=False).replace('\n', newline + '  ')
+
+def patch_output_file(patched_entries, output_file=OUTPUT_FILE):
+    """Remplace en place les entrées modifiées sans resérialiser les autres entrées"""
+    with open(output_file, 'r', encoding='utf-8', newline='') as f:
+        text = f.read()
+    
+    # Conserver les fins de ligne du fichier existant
+    newline = '\r\n' if '\r\n' in text else '\n'
+    pending = {normalize_id(entry['id']): entry for entry in patched_entries}
+    pieces = []
+    position = 0
+    last_end = None
+    for start, end, item in iter_json_array_spans(text):
+        last_end = end
+        entry = pending.pop(normalize_id(item['id']), None)
+        if entry is not None:
+            pieces.append(text[position:start])
+            pieces.append(format_entry(entry, newline))
+            position = end
+    
+    # Les entrées absentes du fichier traduit sont ajoutées à la fin du tableau
+    if pending:
+        if last_end is None:
+            last_end = text.index('[') + 1
+            new_items = ("," + newline + "  ").join(format_entry(entry, newline) for entry in pending.values())
+            pieces.append(text[position:last_end])
+            pieces.append(newline + "  " + new_items + newline)
+            position = text.index(']', last_end)
+        else:
+            pieces.append(text[position:last_end])
+            for entry in pending.values():
+                pieces.append("," + newline + "  " + format_entry(entry, newline))
+            position = last_end
+    pieces.append(text[position:])
+    
+    temp_file = output_file + '.tmp'
+    with open(temp_file, 'w', encoding='utf-8', newline='') as f:
+        f.write(''.join(pieces))
+    os.replace(temp_file, output_file)
+
+def read_existing_translations(normalized_ids, output_file=OUTPUT_FILE):
+    """Récupère les entrées déjà traduites correspondant aux IDs demandés"""
+    wanted = set(normalized_ids)
+    existing = {}
+    with open(output_file, 'r', encoding='utf-8', newline='') as f:
+        text = f.read()
+    for _, _, item in iter_json_array_spans(text):
+        normalized = normalize_id(item['id'])
+        if normalized in wanted and normalized not in existing:
+            existing[normalized] = item
+    return existing
+
+def retranslate_entries(ids=None, prefixes=None, fields=None, chunk_size=6, ids_file=None):
+    """Retraduit uniquement les entrées ciblées et les remplace dans battlebase-data.json"""
+    if not os.path.exists(SOURCE_FILE):
+        print(f"❌ {SOURCE_FILE} introuvable: lancez d'abord la traduction complète")
+        return False
+    
+    index = load_source_index()
+    selected = select_entry_ids(index, ids, prefixes, fields)
+    if not selected:
+        print("Aucune entrée à retraduire")
+        return True
+    
+    source_entries = read_indexed_entries(index, selected)
+    existing = read_existing_translations(selected) if os.path.exists(OUTPUT_FILE) else {}
+    print(f"{len(source_entries)} entrées à retraduire")
+    
+    # Avec --fields, seuls les champs demandés sont envoyés à Claude
+    # (les entrées encore absentes du fichier traduit sont traduites entièrement)
+    to_translate = []
+    for normalized, entry in zip(selected, source_entries):
+        if fields and normalized in existing:
+            entry = {key: value for key, value in entry.items() if key == 'id' or key in fields}
+        to_translate.append(entry)
+    
+    translated = {}
+    position = 0
+    chunk_number = 0
+    while position < len(to_translate):
+        chunk_number += 1
+        chunk = to_translate[position:position + chunk_size]
+        try:
+            translated_chunk = translate_chunk_with_claude(chunk, chunk_number, max_retries=5)
+        except subprocess.TimeoutExpired:
+            translated_chunk = None
+        
+        if translated_chunk:
+            chunk_ids = {normalize_id(item['id']) for item in chunk}
+            for item in translated_chunk:
+                normalized = normalize_id(item.get('id', ''))
+                if normalized in chunk_ids:
+                    translated[normalized] = item
+            position += len(chunk)
+        elif chunk_size > 1:
+            chunk_size = max(1, chunk_size // 2)
+            print(f"  Réduction de la taille à {chunk_size}")
+        else:
+            print(f"  ❌ Impossible de traduire cette entrée, passage au suivant")
+            position += 1
+    
+    # Fusionner les traductions avec les entrées existantes
+    patched_entries = []
+    failed_ids = []
+    untranslated_ids = []
+    for normalized, source_entry, sent in zip(selected, source_entries, to_translate):
+        item = translated.get(normalized)
+        field_only = fields and normalized in existing
+        # Une retraduction n'est réussie que si tous les champs envoyés sont revenus
+        if item is None or any(key not in item for key in sent):
+            failed_ids.append(source_entry['id'])
+            if not field_only:
+                untranslated_ids.append(source_entry['id'])
+            continue
+        if field_only:
+            entry = dict(existing[normalized])
+            for field in fields:
+                if field in item:
+                    entry[field] = item[field]
+        else:
+            entry = item
+        entry['id'] = source_entry['id'].replace('_', '-')
+        patched_entries.append(entry)
+    
+    if patched_entries:
+        if os.path.exists(OUTPUT_FILE):
+            patch_output_file(patched_entries)
+        else:
+            with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
+                json.dump(patched_entries, f, indent=2, ensure_ascii=False)
+    
+    print(f"\n{'='*60}")
+    print(f"Retraduction terminée: {len(patched_entries)}/{len(selected)} entrées mises à jour dans {OUTPUT_FILE}")
+    
+    if failed_ids:
+        print(f"⚠️  {len(failed_ids)} entrées n'ont pas pu être retraduites:")
+        for entry_id in failed_ids[:5]:
+            print(f"     - {entry_id}")
+        if len(failed_ids) > 5:
+            print(f"     ... et {len(failed_ids) - 5} autres")
+    
+    # Le fichier d'IDs n'est mis à jour que s'il a servi à la sélection (--ids-from)
+    if ids_file:
+        update_untranslated_ids(patched_entries, untranslated_ids, ids_file)
+    return not failed_ids
+
+def update_untranslated_ids(patched_entries, failed_ids, ids_file):
+    """Retire les IDs corrigés du fichier d'IDs non traduits et y ajoute les nouveaux échecs"""
+    remaining = read_ids_file(ids_file) if os.path.exists(ids_file) else []
+    patched = {normalize_id(entry['id']) for entry in patched_entries}
+    remaining = [entry_id for entry_id in remaining if normalize_id(entry_id) not in patched]
+    known = {normalize_id(entry_id) for entry_id in remaining}
+    for entry_id in failed_ids:
+        if normalize_id(entry_id) not in known:
+            remaining.append(entry_id)
+            known.add(normalize_id(entry_id))
+    
+    with open(ids_file, 'w', encoding='utf-8') as f:
+        if remaining:
+            f.write('\n'.join(remaining))
+            print(f"⚠️  {len(remaining)} IDs restent à traduire dans {ids_file}")
+        else:
+            f.write(NO_UNTRANSLATED_IDS)
+            print(f"✅ Plus aucun ID à traduire dans {ids_file}")
+
+def read_ids_file(path):
+    """Lit un fichier d'IDs (un par ligne), comme untranslated_ids.txt"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f
+                if line.strip() and line.strip() != NO_UNTRANSLATED_IDS]
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Traduction de battlebase-data. Sans option, télécharge et traduit l'intégralité du fichier."
+    )
+    parser.add_argument('--ids', nargs='+', metavar='ID',
+                        help="IDs des entrées à retraduire")
+    parser.add_argument('--ids-from', metavar='FICHIER',
+                        help="fichier contenant les IDs à retraduire, un par ligne (ex: untranslated_ids.txt)")
+    parser.add_argument('--faction', action='append', metavar='PREFIXE',
+                        help="préfixe d'ID des entrées à retraduire (ex: stratagem-space-wolves)")
+    parser.add_argument('--fields', nargs='+', metavar='CHAMP',
+                        help="champs à retraduire (ex: lore effectRules), les autres champs sont conservés")
+    parser.add_argument('--chunk-size', type=int, default=6,
+                        help="nombre d'entrées par appel à Claude en mode ciblé (défaut: 6)")
+    args = parser.parse_args(argv)
+    if args.chunk_size < 1:
+        parser.error("--chunk-size doit être supérieur ou égal à 1")
+    if args.ids_from and not os.path.isfile(args.ids_from):
+        parser.error(f"--ids-from: fichier introuvable: {args.ids_from}")
+    return args
+
 def main():
     # Télécharger le fichier
     if not download_latest_file():
@@ -351,14 +673,14 @@ def main():
     
     # Charger le fichier original
     print("\nChargement du fichier...")
-    with open('battlebase-data-en.json', 'r', encoding='utf-8') as f:
+    with open(SOURCE_FILE, 'r', encoding='utf-8') as f:
         data = json.load(f)
     
     print(f"Total: {len(data)} entrées")
     
     # Initialiser
     translated_data = []
-    output_file = 'battlebase-data.json'
+    output_file = OUTPUT_FILE
     
     # Variables pour la logique adaptative
     current_chunk_size = 18  # On commence avec 18 entrées
@@ -656,10 +978,10 @@ Retourne UNIQUEMENT le JSON traduit, sans texte avant ou après."""
         
         # Sauvegarder les IDs des entrées réellement non traduites
         untranslated_ids = [item['id'] for item in truly_missing_entries]
-        with open('untranslated_ids.txt', 'w', encoding='utf-8') as f:
+        with open(UNTRANSLATED_IDS_FILE, 'w', encoding='utf-8') as f:
             if untranslated_ids:
                 f.write('\n'.join(untranslated_ids))
-                print(f"   {len(untranslated_ids)} IDs non traduits ont été sauvegardés dans untranslated_ids.txt")
+                print(f"   {len(untranslated_ids)} IDs non traduits ont été sauvegardés dans {UNTRANSLATED_IDS_FILE}")
                 # Afficher les premiers IDs manquants
                 print("\n   Exemples d'IDs manquants:")
                 for id in untranslated_ids[:5]:
@@ -667,8 +989,17 @@ Retourne UNIQUEMENT le JSON traduit, sans texte avant ou après."""
                 if len(untranslated_ids) > 5:
                     print(f"     ... et {len(untranslated_ids) - 5} autres")
             else:
-                f.write("Aucun ID non traduit trouvé")
+                f.write(NO_UNTRANSLATED_IDS)
                 print("   ✅ Aucun ID réellement manquant")
 
 if __name__ == "__main__":
+    args = parse_arguments()
+    if args.ids or args.ids_from or args.faction or args.fields:
+        ids = None
+        if args.ids or args.ids_from:
+            ids = list(args.ids or [])
+            if args.ids_from:
+                ids.extend(read_ids_file(args.ids_from))
+        success = retranslate_entries(ids, args.faction, args.fields, args.chunk_size, args.ids_from)
+        sys.exit(0 if success else 1)
     main()
\ No newline at end of file